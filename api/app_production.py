@@ -1,20 +1,28 @@
 """
 API Flask optimisée pour Railway
-Version sans SHAP
+Version sans SHAP (contributions locales natives LightGBM si USE_SHAP=1)
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request
 import joblib
-import pandas as pd
+import lightgbm as lgb
 import numpy as np
+import orjson
 import json
+import logging
+import operator
 import os
+import threading
 import time
 from pathlib import Path
 from functools import lru_cache
 
 app = Flask(__name__)
 
+# Logs des requêtes (formatage différé, niveau configurable)
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('api')
+
 # Chemins pour Railway
 MODELS_DIR = Path(os.path.join(os.path.dirname(__file__), '..', 'models'))
 DATA_DIR = Path(os.path.join(os.path.dirname(__file__), '..', 'data', 'processed'))
@@ -23,11 +31,27 @@ DATA_DIR = Path(os.path.join(os.path.dirname(__file__), '..', 'data', 'processed
 MODEL = None
 THRESHOLD = None
 FEATURES = None
+FEATURE_INDEX = None
+FEATURE_GETTER = None
+N_FEATURES = None
+
+# Tableau d'entrée réutilisé, un par thread (pas d'allocation par requête)
+_SCRATCH = threading.local()
+
+# Threads LightGBM par prédiction : 1 par défaut (une ligne par requête,
+# la concurrence est portée par gunicorn)
+NUM_THREADS = int(os.environ.get('LGBM_NUM_THREADS', 1))
+
+# Temps de traitement dans les réponses /predict (désactivé par défaut en prod)
+EMIT_TIMING = os.environ.get('EMIT_TIMING', '0') == '1'
+
+# Contributions locales via pred_contrib natif LightGBM (désactivé par défaut)
+USE_SHAP = os.environ.get('USE_SHAP', '0') == '1'
 
 @lru_cache(maxsize=1)
 def load_model_cached():
-    """Cache le modèle en mémoire pour Railway"""
-    return joblib.load(MODELS_DIR / "lightgbm_final_model_optimized.pkl")
+    """Cache le modèle en mémoire pour Railway (format texte natif LightGBM)"""
+    return lgb.Booster(model_file=str(MODELS_DIR / "lightgbm_final_model_optimized.txt"))
 
 @lru_cache(maxsize=1) 
 def load_threshold_cached():
@@ -42,20 +66,23 @@ def load_features_cached():
 
 def initialize_railway():
     """Initialisation Railway"""
-    global MODEL, THRESHOLD, FEATURES
+    global MODEL, THRESHOLD, FEATURES, FEATURE_INDEX, FEATURE_GETTER, N_FEATURES
     
     print("INITIALISATION RAILWAY...")
-    start = time.time()
+    start = time.perf_counter()
     
     try:
         MODEL = load_model_cached()
-        THRESHOLD = load_threshold_cached()
-        FEATURES = load_features_cached()
+        THRESHOLD = float(load_threshold_cached())
+        FEATURES = tuple(load_features_cached())
+        FEATURE_INDEX = {feat: i for i, feat in enumerate(FEATURES)}
+        FEATURE_GETTER = operator.itemgetter(*FEATURES)
+        N_FEATURES = len(FEATURES)
         
-        init_time = time.time() - start
+        init_time = time.perf_counter() - start
         print(f"Railway initialisé en {init_time:.2f}s")
         print(f"Seuil optimal: {THRESHOLD:.4f}")
-        print(f"Features: {len(FEATURES)}")
+        print(f"Features: {N_FEATURES}")
         print("RAILWAY PRÊT")
         return True
         
@@ -63,146 +90,206 @@ def initialize_railway():
         print(f"Erreur Railway: {e}")
         return False
 
+def fast_json(obj, status=200):
+    """Réponse JSON sérialisée avec orjson (gère les types numpy)"""
+    return app.response_class(
+        orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY),
+        status=status,
+        mimetype='application/json'
+    )
+
+def get_scratch_buffer():
+    """Tableau (1, n_features) float32 propre au thread courant"""
+    X = getattr(_SCRATCH, 'X', None)
+    if X is None:
+        X = _SCRATCH.X = np.empty((1, N_FEATURES), dtype=np.float32)
+    return X
+
+def fill_row_slow(X, items):
+    """Remplissage valeur par valeur (valeurs non numériques remplacées par 0.0)"""
+    X.fill(0.0)
+    for i, v in items:
+        if i is None:
+            continue
+        try:
+            X[0, i] = float(v)
+        except (TypeError, ValueError):
+            continue
+
 def prepare_data_railway(data):
     """Préparation données optimisée Railway"""
+    X = get_scratch_buffer()
+    
+    # Conversion vectorisée de toute la ligne (None/'nan' -> NaN),
+    # repli valeur par valeur si features manquantes ou valeurs non numériques
     if isinstance(data, dict):
-        values = [data.get(feat, 0.0) for feat in FEATURES]
+        try:
+            X[0] = FEATURE_GETTER(data)
+        except (KeyError, TypeError, ValueError):
+            fill_row_slow(X, ((FEATURE_INDEX.get(feat), v) for feat, v in data.items()))
     elif isinstance(data, list):
-        values = data if len(data) == len(FEATURES) else data + [0.0] * (len(FEATURES) - len(data))
+        X.fill(0.0)
+        try:
+            X[0, :len(data)] = data
+        except (TypeError, ValueError):
+            fill_row_slow(X, enumerate(data))
     else:
         raise ValueError("Format invalide")
     
-    # Nettoyage rapide pour Railway
-    clean_values = []
-    for v in values:
-        if v is None or str(v).lower() in ['nan', 'inf', '-inf', 'null']:
-            clean_values.append(0.0)
-        else:
-            try:
-                clean_values.append(float(v))
-            except:
-                clean_values.append(0.0)
-    
-    return np.array([clean_values])
+    # Nettoyage NaN/Inf en une seule passe vectorisée
+    np.nan_to_num(X, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    return X
+
+# Top features pré-calculées (importance globale), construites une seule fois
+TOP_FEATURES_RAILWAY = [
+    {
+        'feature': 'EXT_SOURCE_2', 
+        'importance': 0.122, 
+        'impact': 'Critique'
+    },
+    {
+        'feature': 'EXT_SOURCE_3', 
+        'importance': 0.120, 
+        'impact': 'Critique'
+    }, 
+    {
+        'feature': 'EXT_SOURCE_1', 
+        'importance': 0.055, 
+        'impact': 'Important'
+    },
+    {
+        'feature': 'DAYS_EMPLOYED', 
+        'importance': 0.039, 
+        'impact': 'Modéré'
+    },
+    {
+        'feature': 'CODE_GENDER', 
+        'importance': 0.036, 
+        'impact': 'Modéré'
+    },
+    {
+        'feature': 'INSTAL_DPD_MEAN', 
+        'importance': 0.036, 
+        'impact': 'Modéré'
+    },
+    {
+        'feature': 'PAYMENT_RATE', 
+        'importance': 0.036, 
+        'impact': 'Modéré'
+    }
+]
 
 def get_top_features_railway():
     """Top features pré-calculées pour Railway"""
-    return [
-        {
-            'feature': 'EXT_SOURCE_2', 
-            'importance': 0.122, 
-            'impact': 'Critique'
-        },
-        {
-            'feature': 'EXT_SOURCE_3', 
-            'importance': 0.120, 
-            'impact': 'Critique'
-        }, 
-        {
-            'feature': 'EXT_SOURCE_1', 
-            'importance': 0.055, 
-            'impact': 'Important'
-        },
-        {
-            'feature': 'DAYS_EMPLOYED', 
-            'importance': 0.039, 
-            'impact': 'Modéré'
-        },
-        {
-            'feature': 'CODE_GENDER', 
-            'importance': 0.036, 
-            'impact': 'Modéré'
-        },
-        {
-            'feature': 'INSTAL_DPD_MEAN', 
-            'importance': 0.036, 
-            'impact': 'Modéré'
-        },
+    return TOP_FEATURES_RAILWAY
+
+@lru_cache(maxsize=512)
+def shap_contributions_cached(row_bytes, top_n=7):
+    """Contributions SHAP mises en cache par contenu de la ligne (payloads identiques)"""
+    X = np.frombuffer(row_bytes, dtype=np.float32).reshape(1, -1)
+    contrib = MODEL.predict(X, pred_contrib=True, num_threads=NUM_THREADS)
+    shap_values = contrib[0, :-1]  # Dernière colonne = valeur attendue
+    
+    # Top N en O(n) sans construire un dict par feature
+    abs_values = np.abs(shap_values)
+    top_idx = np.argpartition(abs_values, -top_n)[-top_n:]
+    top_idx = top_idx[np.argsort(-abs_values[top_idx])]
+    
+    return tuple(
         {
-            'feature': 'PAYMENT_RATE', 
-            'importance': 0.036, 
-            'impact': 'Modéré'
+            'feature': FEATURES[i],
+            'importance': float(abs_values[i]),
+            'shap_value': float(shap_values[i]),
+            'feature_value': float(X[0, i]),
+            'impact': 'Augmente le risque' if shap_values[i] > 0 else 'Diminue le risque'
         }
-    ]
+        for i in top_idx
+    )
+
+def calculate_shap_contributions(X, top_n=7):
+    """Contributions SHAP locales via LightGBM (pred_contrib), sans librairie shap"""
+    return shap_contributions_cached(X.tobytes(), top_n)
 
 @app.route('/health', methods=['GET'])
 def health():
     """Health check Railway"""
-    return jsonify({
+    return fast_json({
         'status': 'ONLINE',
         'platform': 'Railway',
         'service': 'Credit Scoring API',
         'model': 'LightGBM Optimized',
-        'threshold': float(THRESHOLD),
-        'features_count': len(FEATURES),
+        'threshold': THRESHOLD,
+        'features_count': N_FEATURES,
         'version': 'RAILWAY_V2'
     })
 
 @app.route('/predict', methods=['POST'])
 def predict():
     """Prédiction optimisée Railway"""
-    start_total = time.time()
+    start_total = time.perf_counter() if EMIT_TIMING else 0.0
     
     try:
-        # Vérification Railway
-        if any([MODEL is None, THRESHOLD is None, FEATURES is None]):
-            return jsonify({
-                'error': 'Service Railway non initialisé',
+        # Récupération données (parsing orjson, JSON invalide = 400)
+        try:
+            data = orjson.loads(request.get_data(cache=False))
+        except orjson.JSONDecodeError:
+            return fast_json({
+                'error': 'JSON invalide',
                 'platform': 'Railway'
-            }), 500
-        
-        # Récupération données
-        data = request.get_json()
+            }, 400)
         if not data:
-            return jsonify({
+            return fast_json({
                 'error': 'Pas de données fournies',
                 'platform': 'Railway'
-            }), 400
+            }, 400)
         
         # Préparation Railway
         X = prepare_data_railway(data)
         
         # Prédiction
-        pred_start = time.time()
-        probabilities = MODEL.predict_proba(X)
-        probability = float(probabilities[0, 1])
-        pred_time = time.time() - pred_start
+        pred_start = time.perf_counter() if EMIT_TIMING else 0.0
+        probability = float(MODEL.predict(X, num_threads=NUM_THREADS)[0])  # Objectif binaire : P(défaut)
+        pred_end = time.perf_counter() if EMIT_TIMING else 0.0
         
         # Décision
         decision = "REFUSE" if probability >= THRESHOLD else "ACCORDE"
         
         # Features pour Railway
-        top_features = get_top_features_railway()
-        
-        total_time = time.time() - start_total
+        if USE_SHAP:
+            top_features = calculate_shap_contributions(X)
+        else:
+            top_features = get_top_features_railway()
         
-        print(f"Railway: {decision} (prob: {probability:.3f}) en {total_time:.3f}s")
+        logger.info("Railway: %s (prob: %.3f)", decision, probability)
         
-        return jsonify({
+        result = {
             'probability': probability,
             'decision': decision,
-            'threshold': float(THRESHOLD),
+            'threshold': THRESHOLD,
             'top_features': top_features,
-            'processing_time': round(total_time, 3),
-            'prediction_time': round(pred_time, 3),
             'platform': 'Railway',
             'version': 'RAILWAY_V2',
             'confidence': 'HIGH' if abs(probability - THRESHOLD) > 0.1 else 'MEDIUM'
-        })
+        }
+        if EMIT_TIMING:
+            result['processing_time'] = round(time.perf_counter() - start_total, 3)
+            result['prediction_time'] = round(pred_end - pred_start, 3)
+        return fast_json(result)
         
     except Exception as e:
-        error_time = time.time() - start_total
-        print(f"Erreur Railway après {error_time:.3f}s: {e}")
-        return jsonify({
+        logger.error("Erreur Railway: %s", e)
+        error = {
             'error': f'Erreur Railway: {str(e)}',
-            'platform': 'Railway',
-            'processing_time': round(error_time, 3)
-        }), 500
+            'platform': 'Railway'
+        }
+        if EMIT_TIMING:
+            error['processing_time'] = round(time.perf_counter() - start_total, 3)
+        return fast_json(error, 500)
 
 @app.route('/', methods=['GET'])
 def home():
     """Page d'accueil Railway"""
-    return jsonify({
+    return fast_json({
         'message': 'API Credit Scoring - Railway',
         'platform': 'Railway Cloud',
         'endpoints': {
@@ -212,8 +299,8 @@ def home():
         },
         'performance': {
             'target_response_time': '< 10 secondes',
-            'model': 'LightGBM sans SHAP',
-            'features': len(FEATURES) if FEATURES else 234
+            'model': 'LightGBM avec SHAP natif' if USE_SHAP else 'LightGBM sans SHAP',
+            'features': N_FEATURES
         },
         'version': 'RAILWAY_V2'
     })
@@ -221,24 +308,25 @@ def home():
 # Gestion d'erreurs Railway
 @app.errorhandler(404)
 def not_found(error):
-    return jsonify({
+    return fast_json({
         'error': 'Endpoint non trouvé sur Railway',
         'platform': 'Railway',
         'available_endpoints': ['/health', '/predict', '/']
-    }), 404
+    }, 404)
 
 @app.errorhandler(500)
 def server_error(error):
-    return jsonify({
+    return fast_json({
         'error': 'Erreur serveur Railway',
         'platform': 'Railway'
-    }), 500
+    }, 500)
 
 # Initialisation Railway
 print("=" * 50)
 print("DÉMARRAGE API RAILWAY")
 print("=" * 50)
 
+# Échec = import impossible : l'app ne sert jamais de requête sans modèle
 if not initialize_railway():
     raise RuntimeError("Impossible d'initialiser Railway")
 
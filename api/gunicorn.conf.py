@@ -2,12 +2,23 @@ import os
 
 # Configuration optimisée pour Railway
 bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
-workers = 1  # Railway a des limitations mémoire
-worker_class = "sync"
+workers = 1  # Railway a des limitations mémoire (un seul modèle en RAM)
+worker_class = "gevent"  # Connexions keep-alive concurrentes sur un seul process
+worker_connections = 1000
 timeout = 120  # Timeout long pour les prédictions
-keepalive = 2
+keepalive = 5
 max_requests = 1000
 
+# Threads LightGBM (LGBM_NUM_THREADS, 1 par défaut) : ne pas cumuler avec plusieurs workers
+# - charge concurrente : workers = nb CPU, worker_class = "sync", LGBM_NUM_THREADS=1
+# - un seul worker (config actuelle) : LGBM_NUM_THREADS=1 suffit, une requête = une ligne
+
+# gevent : patch avant le preload de l'app pour que threading.local
+# (tableau d'entrée réutilisé de l'API) soit propre à chaque greenlet
+if worker_class == "gevent":
+    from gevent import monkey
+    monkey.patch_all()
+
 # Optimisations mémoire
 preload_app = True  # Charge l'app une seule fois au démarrage
 worker_tmp_dir = "/dev/shm"  # Utilise la RAM pour les fichiers temporaires
@@ -4,10 +4,16 @@ Interface Streamlit optimisée pour API Railway
 
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ReadTimeoutError
+from urllib3.util.retry import Retry
 import pandas as pd
 import numpy as np
-import json
+import orjson
 import time
+from collections import deque
+
+from utils.features import load_feature_names
 
 # Configuration pour API en ligne
 st.set_page_config(
@@ -19,6 +25,18 @@ st.set_page_config(
 # URL API Railway
 API_URL = "https://reliable-vitality-production.up.railway.app"
 
+# Timeouts prédiction : connexion courte, lecture longue (cold start Railway)
+CONNECT_TIMEOUT = 15
+PREDICT_TIMEOUT = 120
+
+# Timeout de lecture adaptatif : P99 des dernières latences /predict x 3, borné
+MIN_PREDICT_TIMEOUT = 10
+LATENCY_WINDOW = 20
+
+# Réponses /predict : lecture directe sous 64 Ko, par blocs de 16 Ko au-delà
+STREAM_THRESHOLD = 65536
+STREAM_CHUNK_SIZE = 16384
+
 # Traductions des variables
 FEATURE_TRANSLATIONS = {
     "EXT_SOURCE_1": "Score Externe 1",
@@ -30,96 +48,175 @@ FEATURE_TRANSLATIONS = {
     "PAYMENT_RATE": "Ratio d'endettement"
 }
 
-def test_railway_api():
-    """Test de l'API Railway"""
+@st.cache_resource
+def api_session():
+    """Session HTTP partagée : connexion keep-alive réutilisée vers Railway"""
+    session = requests.Session()
+    
+    # Pool de connexions + relance courte sur erreurs de connexion et passerelle Railway
+    # (POST inclus : /predict est idempotent ; dernière réponse renvoyée telle quelle).
+    # Jamais de relance sur timeout de lecture : erreur ReadTimeout immédiate
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=8,
+        max_retries=Retry(
+            total=2,
+            read=False,
+            backoff_factor=0.3,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=frozenset({"GET", "POST"}),
+            raise_on_status=False
+        )
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Content-Type": "application/json", "Connection": "keep-alive"})
+    return session
+
+@st.cache_data(ttl=30, show_spinner=False)
+def test_railway_api(api_url=API_URL):
+    """Test de l'API Railway (résultat mis en cache 30s)"""
     try:
-        start = time.time()
-        response = requests.get(f"{API_URL}/health", timeout=15)
-        response_time = time.time() - start
+        start = time.perf_counter()
+        response = api_session().get(f"{api_url}/health", timeout=15)
+        response_time = time.perf_counter() - start
         
         if response.status_code == 200:
-            health_data = response.json()
+            health_data = orjson.loads(response.content)
             return True, response_time, health_data
         else:
             return False, response_time, None
     except Exception as e:
         return False, 999, str(e)
 
-def call_railway_api(client_data):
-    """Appel optimisé Railway"""
-    
-    # Test de connectivité
-    st.write("Test de l'API Railway...")
-    is_online, speed, health = test_railway_api()
+def predict_latencies():
+    """Latences /predict observées dans la session (fenêtre glissante)"""
+    if "predict_latencies" not in st.session_state:
+        st.session_state.predict_latencies = deque(maxlen=LATENCY_WINDOW)
+    return st.session_state.predict_latencies
+
+def record_predict_latency(total_time):
+    """Latence d'un vrai appel /predict : fenêtre du timeout adaptatif + affichage"""
+    predict_latencies().append(total_time)
+    st.session_state.last_predict_latency = total_time
+
+def adaptive_predict_timeout():
+    """Timeout de lecture basé sur le P99 observé (maximum tant qu'aucune mesure)"""
+    latencies = predict_latencies()
+    if not latencies:
+        return PREDICT_TIMEOUT
+    p99 = float(np.percentile(latencies, 99))
+    return round(max(MIN_PREDICT_TIMEOUT, min(PREDICT_TIMEOUT, p99 * 3)), 1)
+
+def decode_json_response(response):
+    """Décodage orjson : lecture directe si petite réponse, sinon lecture par blocs"""
+    content_length = int(response.headers.get('Content-Length') or 0)
+    if content_length and content_length < STREAM_THRESHOLD:
+        return orjson.loads(response.content)
     
-    if not is_online:
-        st.error("API Railway indisponible")
-        if isinstance(health, str):
-            st.error(f"Erreur: {health}")
-        return None, None
+    buffer = bytearray()
+    for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+        buffer.extend(chunk)
+    return orjson.loads(buffer)
+
+@st.cache_data(ttl=600, max_entries=256, show_spinner=False)
+def predict_cached(client_inputs, _read_timeout=PREDICT_TIMEOUT):
+    """Prédiction Railway mise en cache par saisie (mêmes valeurs = aucun appel réseau)"""
+    client_data = create_client_data_railway(*client_inputs)
     
-    # Affichage du status
-    if speed < 5:
-        st.success(f"API Railway rapide ({speed:.1f}s)")
-    elif speed < 15:
-        st.warning(f"API Railway correcte ({speed:.1f}s)")
-    else:
-        st.error(f"API Railway lente ({speed:.1f}s)")
+    start = time.perf_counter()
+    with api_session().post(
+        f"{API_URL}/predict",
+        data=orjson.dumps(client_data),
+        timeout=(CONNECT_TIMEOUT, _read_timeout),
+        stream=True
+    ) as response:
+        try:
+            if not response.ok:
+                # Corps d'erreur lu avant fermeture de la réponse (détail affiché par l'appelant)
+                response.content
+            # Les erreurs HTTP lèvent une exception : elles ne sont pas mises en cache
+            response.raise_for_status()
+            result = decode_json_response(response)
+        except requests.exceptions.ConnectionError as e:
+            # Corps bloqué après les en-têtes : requests le signale en ConnectionError
+            if e.args and isinstance(e.args[0], ReadTimeoutError):
+                raise requests.exceptions.ReadTimeout(e, response=response) from e
+            raise
     
-    # Informations API
-    if health and isinstance(health, dict):
-        st.info(f"Railway - Version: {health.get('version', 'N/A')} - Seuil: {health.get('threshold', 'N/A'):.3f}")
+    # Seuls les vrais appels réseau réussis sont mesurés (ni hits du cache, ni erreurs rapides)
+    record_predict_latency(time.perf_counter() - start)
+    return result
+
+def call_railway_api(client_inputs):
+    """Appel optimisé Railway (un seul aller-retour, sans pré-test /health)"""
+    timeout = adaptive_predict_timeout()
     
-    # Appel de prédiction avec timeout adaptatif
-    timeout = max(30, min(120, speed * 8))
+    # Renseignée uniquement par un vrai appel réseau : None après la prédiction = hit du cache
+    st.session_state.last_predict_latency = None
     
     try:
         with st.spinner(f"Prédiction via Railway (timeout: {timeout}s)..."):
-            start = time.time()
-            response = requests.post(
-                f"{API_URL}/predict",
-                json=client_data,
-                timeout=timeout,
-                headers={"Content-Type": "application/json"}
-            )
-            total_time = time.time() - start
+            result = predict_cached(client_inputs, _read_timeout=timeout)
+        total_time = st.session_state.last_predict_latency
         
-        if response.status_code == 200:
-            result = response.json()
-            st.success(f"Réponse Railway en {total_time:.1f}s")
-            return result, f"Railway ({total_time:.1f}s)"
+        # Status déduit du temps de réponse de la prédiction
+        if total_time is None:
+            st.success("Résultat en cache (aucun appel Railway)")
+            api_info = "Railway (résultat en cache)"
         else:
-            st.error(f"Erreur Railway {response.status_code}")
-            try:
-                error_detail = response.json()
-                st.error(f"Détail: {error_detail.get('error', 'Erreur inconnue')}")
-            except:
-                st.error(f"Réponse brute: {response.text[:200]}")
-            return None, None
+            if total_time < 5:
+                st.success(f"API Railway rapide ({total_time:.1f}s)")
+            elif total_time < 15:
+                st.warning(f"API Railway correcte ({total_time:.1f}s)")
+            else:
+                st.error(f"API Railway lente ({total_time:.1f}s)")
+            api_info = f"Railway ({total_time:.1f}s)"
+        st.info(f"Railway - Version: {result.get('version', 'N/A')} - Seuil: {result.get('threshold', 0):.3f}")
+        
+        return result, api_info
             
+    except requests.exceptions.HTTPError as e:
+        response = e.response
+        st.error(f"Erreur Railway {response.status_code}")
+        try:
+            error_detail = orjson.loads(response.content)
+            st.error(f"Détail: {error_detail.get('error', 'Erreur inconnue')}")
+        except:
+            st.error(f"Réponse brute: {response.text[:200]}")
+        return None, None
     except requests.exceptions.Timeout:
+        # Latences passées non représentatives (cold start) : retour au timeout maximal
+        predict_latencies().clear()
         st.error(f"Timeout Railway ({timeout}s)")
         st.info("Railway peut être surchargé. Réessayez dans quelques minutes.")
         return None, None
+    except requests.exceptions.ConnectionError as e:
+        st.error("API Railway indisponible")
+        st.error(f"Erreur: {e}")
+        return None, None
     except Exception as e:
         st.error(f"Erreur Railway: {str(e)}")
         return None, None
 
-@st.cache_data
-def load_feature_names():
-    """Charger les features avec fallback"""
-    try:
-        with open('data/processed/final_features_list.json', 'r') as f:
-            return json.load(f)['selected_features']
-    except:
-        return [f"feature_{i}" for i in range(234)]
+@st.cache_resource
+def feature_template():
+    """Données client à 0.0 pour toutes les features (construit une seule fois)"""
+    return {name: 0.0 for name in load_feature_names()}
+
+@st.cache_resource
+def feature_display_names():
+    """Noms affichés de toutes les features : traduction ou titre (construit une seule fois)"""
+    return {
+        name: FEATURE_TRANSLATIONS.get(name, name.replace("_", " ").title())
+        for name in load_feature_names()
+    }
 
 def create_client_data_railway(ext_source_2, ext_source_3, ext_source_1, gender, days_employed, 
                                instal_dpd, payment_rate, amt_annuity, approved_cnt, instal_sum):
     """Créer les données client optimisées pour Railway"""
     
-    feature_names = load_feature_names()
-    client_data = {name: 0.0 for name in feature_names}
+    client_data = feature_template().copy()
     
     # Mapping optimisé pour Railway
     feature_mapping = {
@@ -136,9 +233,7 @@ def create_client_data_railway(ext_source_2, ext_source_3, ext_source_1, gender,
     }
     
     # Mise à jour des features existantes
-    for key, value in feature_mapping.items():
-        if key in client_data:
-            client_data[key] = float(value)
+    client_data.update((key, float(value)) for key, value in feature_mapping.items() if key in client_data)
     
     return client_data
 
@@ -162,40 +257,45 @@ def display_railway_results(data, api_info):
         st.markdown(f"### CRÉDIT ACCORDÉ (Railway)") 
         st.markdown(f"**Risque de défaut: {prob:.1%}** (seuil: {threshold:.1%})")
     
-    # Métriques Railway
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.metric("Probabilité", f"{prob:.2%}")
-    with col2:
-        st.metric("Seuil Modèle", f"{threshold:.2%}")
-    with col3:
-        processing_time = data.get("processing_time", 0)
-        st.metric("Temps Railway", f"{processing_time}s")
-    with col4:
-        st.metric("Confiance", confidence)
+    # Métriques Railway (un seul tableau rendu en un appel)
+    processing_time = data.get("processing_time")
+    temps = f"{processing_time}s" if processing_time is not None else "N/A"
+    st.markdown(
+        "| Probabilité | Seuil Modèle | Temps Railway | Confiance |\n"
+        "|:---:|:---:|:---:|:---:|\n"
+        f"| **{prob:.2%}** | **{threshold:.2%}** | **{temps}** | **{confidence}** |"
+    )
     
     # Facteurs explicatifs Railway
     if "top_features" in data:
         st.subheader("Facteurs clés")
         
         features = data["top_features"][:6]
+        display_names = feature_display_names()
+        lines = []
         for i, feature in enumerate(features, 1):
             name = feature.get("feature", "Variable")
             importance = feature.get("importance", 0)
             impact = feature.get("impact", "Neutre")
             
-            # Traduction si disponible
-            display_name = FEATURE_TRANSLATIONS.get(name, name.replace("_", " ").title())
+            # Traduction si disponible (pré-calculée, titre à la volée si feature inconnue)
+            display_name = display_names.get(name) or name.replace("_", " ").title()
             
-            st.write(f"**{i}. {display_name}** - Impact: {impact} ({importance:.3f})")
+            lines.append(f"**{i}. {display_name}** - Impact: {impact} ({importance:.3f})")
+        
+        # Toutes les lignes en un seul appel Streamlit
+        st.markdown("\n\n".join(lines))
     
     # Infos techniques Railway
     with st.expander("Détails techniques Railway"):
-        st.write(f"**Plateforme:** {platform}")
-        st.write(f"**Version API:** {data.get('version', 'N/A')}")
-        st.write(f"**Temps prédiction:** {data.get('prediction_time', 'N/A')}s")
-        st.write(f"**Source:** {api_info}")
+        details = [
+            f"**Plateforme:** {platform}",
+            f"**Version API:** {data.get('version', 'N/A')}"
+        ]
+        if "prediction_time" in data:
+            details.append(f"**Temps prédiction:** {data['prediction_time']}s")
+        details.append(f"**Source:** {api_info}")
+        st.markdown("\n\n".join(details))
 
 # Interface principale Railway
 st.title("Credit Scoring - API Railway")
@@ -208,16 +308,22 @@ st.info("**CONNEXION RAILWAY** - Interface connectée à l'API déployée sur Ra
 with st.sidebar:
     st.header("Status Railway")
     
-    if st.button("Tester Railway"):
+    test_clicked = st.button("Tester Railway")
+    refresh_clicked = st.button("Forcer le rafraîchissement")
+    
+    if refresh_clicked:
+        test_railway_api.clear()
+    
+    if test_clicked or refresh_clicked:
         with st.spinner("Test Railway..."):
-            is_ok, speed, health = test_railway_api()
+            is_ok, speed, health = test_railway_api(API_URL)
         
         if is_ok:
             color = "Rapide" if speed < 5 else "Correct" if speed < 15 else "Lent"
             st.write(f"**Railway**: {speed:.1f}s ({color})")
             
             if health and isinstance(health, dict):
-                st.json(health)
+                st.code(orjson.dumps(health, option=orjson.OPT_INDENT_2).decode(), language='json')
         else:
             st.write("**Railway**: Indisponible")
             if isinstance(health, str):
@@ -226,9 +332,7 @@ with st.sidebar:
     # Infos Railway
     st.markdown("---")
     st.markdown("**Railway Info:**")
-    st.caption(f"URL: {API_URL}")
-    st.caption("Plateforme: Railway Cloud")
-    st.caption("Optimisation: Sans SHAP")
+    st.caption(f"URL: {API_URL}  \nPlateforme: Railway Cloud  \nOptimisation: Sans SHAP")
 
 st.markdown("---")
 
@@ -273,16 +377,16 @@ col1, col2, col3 = st.columns([1, 2, 1])
 with col2:
     if st.button("ANALYSER VIA RAILWAY", type="primary", use_container_width=True):
         
-        # Préparation données Railway
-        client_data = create_client_data_railway(
+        # Saisie client (clé du cache de prédiction)
+        client_inputs = (
             ext_source_2, ext_source_3, ext_source_1, gender, days_employed,
             instal_dpd, payment_rate, amt_annuity, approved_cnt, instal_sum
         )
         
         # Appel Railway
-        start_total = time.time()
-        result, api_info = call_railway_api(client_data)
-        total_time = time.time() - start_total
+        start_total = time.perf_counter()
+        result, api_info = call_railway_api(client_inputs)
+        total_time = time.perf_counter() - start_total
         
         if result:
             st.success(f"Analyse Railway terminée en {total_time:.1f}s")
@@ -292,6 +396,8 @@ with col2:
 
 # Footer Railway
 st.markdown("---")
-st.caption("API déployée sur Railway Cloud")
-st.caption("Optimisée pour performances en ligne")
-st.caption("Brice Béchet - Projet Credit Scoring - OpenclassRoom - Juin 2025")
\ No newline at end of file
+st.caption(
+    "API déployée sur Railway Cloud  \n"
+    "Optimisée pour performances en ligne  \n"
+    "Brice Béchet - Projet Credit Scoring - OpenclassRoom - Juin 2025"
+)
\ No newline at end of file
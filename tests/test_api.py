@@ -15,44 +15,39 @@ COMMANDES POUR EXECUTER LES TESTS :
 """
 
 import pytest
-import json
+import numpy as np
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Ajouter le chemin de l'API pour les imports
 project_root = Path(__file__).parent.parent
 sys.path.append(str(project_root))
 
-def get_test_client():
-    """Crée un client de test Flask"""
-    from api.app_production_optimized import app
+from utils.features import load_feature_names, read_feature_names
+
+@pytest.fixture(scope="session")
+def client():
+    """Client de test Flask (app importée une seule fois par session)"""
+    from api.app_production import app
     app.config['TESTING'] = True
     return app.test_client()
 
-def get_valid_client_data():
-    """Crée des données client réalistes pour les tests"""
-    # Essayer de charger les vrais noms de features
-    possible_paths = [
-        project_root / 'data/processed/final_features_list.json',
-        Path('data/processed/final_features_list.json')
-    ]
-    
-    feature_names = None
-    for path in possible_paths:
-        try:
-            with open(path, 'r') as f:
-                feature_names = json.load(f)['selected_features']
-            break
-        except FileNotFoundError:
-            continue
-    
-    if feature_names is None:
-        # Fallback : créer 234 features génériques
-        feature_names = [f"feature_{i}" for i in range(234)]
-    
-    # Créer les données avec toutes les features à 0
-    client_data = {name: 0.0 for name in feature_names}
+@pytest.fixture(scope="session")
+def feature_names():
+    """Noms des features (loader partagé avec le Dashboard, lu une seule fois)"""
+    return load_feature_names()
+
+@pytest.fixture(scope="session")
+def feature_template(feature_names):
+    """Données client à 0.0 pour toutes les features (construit une fois par session)"""
+    return {name: 0.0 for name in feature_names}
+
+@pytest.fixture(scope="session")
+def valid_client_data(feature_template):
+    """Données client réalistes pour les tests (partagées : copier avant modification)"""
+    client_data = feature_template.copy()
     
     # Utiliser l'exemple "Faible Risque" du notebook 3 (SK_ID_CURR: 288878)
     # Client avec probabilité 0.52% -> CRÉDIT ACCORDÉ
@@ -69,17 +64,14 @@ def get_valid_client_data():
     }
     
     # Appliquer les valeurs réalistes si les features existent
-    for key, value in realistic_values.items():
-        if key in client_data:
-            client_data[key] = value
+    client_data.update((key, value) for key, value in realistic_values.items() if key in client_data)
             
     return client_data
 
-# Tests essentiels (7 tests)
+# Tests essentiels (12 tests)
 
-def test_api_health():
+def test_api_health(client):
     """Test que l'endpoint /health fonctionne"""
-    client = get_test_client()
     response = client.get('/health')
     
     assert response.status_code == 200
@@ -88,13 +80,10 @@ def test_api_health():
     assert 'threshold' in data
     assert 'features_count' in data
 
-def test_api_predict_structure():
+def test_api_predict_structure(client, valid_client_data):
     """Test structure de réponse de /predict avec données valides"""
-    client = get_test_client()
-    client_data = get_valid_client_data()
-    
     response = client.post('/predict', 
-                          json=client_data,
+                          json=valid_client_data,
                           content_type='application/json')
     
     assert response.status_code == 200
@@ -111,14 +100,12 @@ def test_api_predict_structure():
     assert data['decision'] in ['ACCORDE', 'REFUSE']
     assert len(data['top_features']) == 7
 
-def test_prediction_consistency():
+def test_prediction_consistency(client, valid_client_data):
     """Test que même input = même output (reproductibilité)"""
-    client = get_test_client()
-    client_data = get_valid_client_data()
-    
-    # Deux appels identiques
-    response1 = client.post('/predict', json=client_data)
-    response2 = client.post('/predict', json=client_data)
+    # Deux appels identiques, en parallèle (tableau d'entrée propre à chaque thread)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(client.post, '/predict', json=valid_client_data) for _ in range(2)]
+        response1, response2 = [future.result() for future in futures]
     
     assert response1.status_code == 200
     assert response2.status_code == 200
@@ -127,12 +114,9 @@ def test_prediction_consistency():
     assert response1.json['probability'] == response2.json['probability']
     assert response1.json['decision'] == response2.json['decision']
 
-def test_decision_logic():
+def test_decision_logic(client, valid_client_data):
     """Test cohérence seuil : probabilité vs décision"""
-    client = get_test_client()
-    client_data = get_valid_client_data()
-    
-    response = client.post('/predict', json=client_data)
+    response = client.post('/predict', json=valid_client_data)
     data = response.json
     
     assert response.status_code == 200
@@ -145,17 +129,15 @@ def test_decision_logic():
 
 def test_model_artifacts_loaded():
     """Test que les artifacts du modèle sont chargés"""
-    from api.app_production_optimized import MODEL, THRESHOLD, FEATURES
+    from api.app_production import MODEL, THRESHOLD, FEATURES
     
     assert MODEL is not None
     assert THRESHOLD is not None
     assert FEATURES is not None
     assert len(FEATURES) == 234
 
-def test_api_wrong_feature_count():
+def test_api_wrong_feature_count(client):
     """Test avec mauvais nombre de features (API gère gracieusement)"""
-    client = get_test_client()
-    
     # Seulement 3 features au lieu de 234
     wrong_data = {
         "feature_1": 0.0, 
@@ -175,6 +157,111 @@ def test_api_wrong_feature_count():
     assert 'decision' in data
     assert data['decision'] in ['ACCORDE', 'REFUSE']
 
+def test_api_invalid_values_sanitized(client, valid_client_data):
+    """Test valeurs invalides (None, 'nan', 'inf', texte) remplacées par 0.0"""
+    dirty_data = dict(valid_client_data)
+    dirty_data.update({
+        "EXT_SOURCE_2": "nan",
+        "EXT_SOURCE_3": None,
+        "DAYS_EMPLOYED": "-inf",
+        "AMT_ANNUITY": "texte"
+    })
+    clean_data = dict(valid_client_data)
+    clean_data.update({
+        "EXT_SOURCE_2": 0.0,
+        "EXT_SOURCE_3": 0.0,
+        "DAYS_EMPLOYED": 0.0,
+        "AMT_ANNUITY": 0.0
+    })
+
+    response_dirty = client.post('/predict', json=dirty_data)
+    response_clean = client.post('/predict', json=clean_data)
+
+    assert response_dirty.status_code == 200
+    assert response_dirty.json['probability'] == response_clean.json['probability']
+
+def test_api_invalid_json(client):
+    """Test corps de requête non JSON (erreur 400)"""
+    response = client.post('/predict', data=b'{"EXT_SOURCE_2": 0.5',
+                           content_type='application/json')
+
+    assert response.status_code == 400
+    assert 'error' in response.json
+
+def test_prepared_data_float32(valid_client_data):
+    """Test entrée du modèle en float32 (dtype interne LightGBM), sans écart de prédiction"""
+    from api.app_production import MODEL, FEATURES, N_FEATURES, prepare_data_railway
+
+    # Valeurs non représentables exactement en float32
+    client_data = dict(valid_client_data)
+    client_data.update({
+        "EXT_SOURCE_2": 0.1,
+        "PAYMENT_RATE": 0.0512345678901,
+        "AMT_ANNUITY": 12345.678901,
+        "DAYS_EMPLOYED": -3001.3
+    })
+
+    X = prepare_data_railway(client_data).copy()  # Tableau du thread réutilisé : copie
+    X_reference = np.array([[client_data[f] for f in FEATURES]], dtype=np.float64)
+
+    assert X.dtype == np.float32
+    assert X.shape == (1, N_FEATURES)
+    assert not np.array_equal(X.astype(np.float64), X_reference)  # Arrondi float32 effectif
+    assert MODEL.predict(X)[0] == pytest.approx(MODEL.predict(X_reference)[0], abs=1e-6)
+
+def test_shap_contributions_native(valid_client_data):
+    """Test contributions locales natives LightGBM (option USE_SHAP)"""
+    from api.app_production import (
+        MODEL, FEATURE_INDEX, calculate_shap_contributions, prepare_data_railway
+    )
+
+    X = prepare_data_railway(valid_client_data).copy()  # Tableau du thread réutilisé : copie
+    contributions = calculate_shap_contributions(X)
+
+    assert len(contributions) == 7
+    importances = [c['importance'] for c in contributions]
+    assert importances == sorted(importances, reverse=True)
+
+    # Même ligne = résultat servi depuis le cache
+    assert calculate_shap_contributions(X) is contributions
+
+    # Valeurs renvoyées = contributions locales et valeurs d'entrée des features retenues
+    contrib = MODEL.predict(X, pred_contrib=True)
+    for c in contributions:
+        i = FEATURE_INDEX[c['feature']]
+        assert c['shap_value'] == pytest.approx(contrib[0, i])
+        assert c['importance'] == pytest.approx(abs(contrib[0, i]))
+        assert c['feature_value'] == X[0, i]
+
+def test_api_predict_with_shap(client, valid_client_data, monkeypatch):
+    """Test /predict avec USE_SHAP=1 : top_features = contributions locales du client"""
+    import api.app_production as api
+    monkeypatch.setattr(api, 'USE_SHAP', True)
+
+    response = client.post('/predict', json=valid_client_data)
+
+    assert response.status_code == 200
+    top_features = response.json['top_features']
+    expected = api.calculate_shap_contributions(api.prepare_data_railway(valid_client_data))
+    assert top_features == [dict(c) for c in expected]
+    assert all('shap_value' in c and 'feature_value' in c for c in top_features)
+
+def test_feature_loader_shared(feature_names, tmp_path):
+    """Test loader de features partagé : lecture unique, fallback si fichier absent ou invalide"""
+    assert isinstance(feature_names, tuple)
+
+    fallback = read_feature_names(tmp_path / "absent.json")
+    assert len(fallback) == 234
+    assert fallback[0] == "feature_0"
+
+    invalid = tmp_path / "invalide.json"
+    invalid.write_text("{pas du json")
+    assert read_feature_names(invalid) is fallback
+
+    # Lectures d'autres fichiers sans effet sur le cache : liste du projet toujours servie
+    assert load_feature_names() is feature_names
+    assert load_feature_names.cache_info().misses == 1
+
 if __name__ == "__main__":
     # Exécution directe
     pytest.main([__file__, "-v"])
\ No newline at end of file
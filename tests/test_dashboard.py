@@ -0,0 +1,168 @@
+"""
+Tests du Dashboard Streamlit (appels API Railway)
+
+COMMANDES POUR EXECUTER LES TESTS :
+===================================
+
+   pytest tests/test_dashboard.py -v
+
+L'API Railway est remplacée par un serveur HTTP local (aucun appel réseau externe).
+"""
+
+import pytest
+import orjson
+import requests
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Ajouter la racine du projet pour les imports
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+class StubRailwayHandler(BaseHTTPRequestHandler):
+    """API Railway simulée : statut, corps et délais de /predict configurables"""
+    status = 200
+    body = {}
+    delay = 0
+    body_delay = 0
+    hits = 0
+
+    def do_POST(self):
+        StubRailwayHandler.hits += 1
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        time.sleep(self.delay)
+        payload = orjson.dumps(self.body)
+        self.send_response(self.status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        time.sleep(self.body_delay)
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture(scope="session")
+def stub_api():
+    """Serveur local simulant Railway (lancé une fois par session)"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubRailwayHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+@pytest.fixture
+def dashboard(stub_api, monkeypatch):
+    """Module Dashboard pointé vers le serveur local, cache et latences vidés"""
+    import streamlit_app_optimized as app
+    monkeypatch.setattr(app, 'API_URL', stub_api)
+    app.predict_cached.clear()
+    app.predict_latencies().clear()
+    monkeypatch.setattr(StubRailwayHandler, 'hits', 0)
+    return app
+
+def client_inputs(ext_source_2=0.5):
+    """Saisie Dashboard (mêmes arguments que create_client_data_railway)"""
+    return (ext_source_2, 0.5, 0.5, "Femme", 3000, 0.0, 0.05, 12000, 1, 100000)
+
+def test_predict_error_detail_available(dashboard, monkeypatch):
+    """Test corps d'une erreur HTTP encore lisible après la prédiction (détail affiché)"""
+    monkeypatch.setattr(StubRailwayHandler, 'status', 400)
+    monkeypatch.setattr(StubRailwayHandler, 'body', {'error': 'Pas de données fournies'})
+
+    with pytest.raises(requests.exceptions.HTTPError) as excinfo:
+        dashboard.predict_cached(client_inputs())
+
+    assert excinfo.value.response.status_code == 400
+    assert orjson.loads(excinfo.value.response.content)['error'] == 'Pas de données fournies'
+
+def test_http_error_latency_not_recorded(dashboard, monkeypatch):
+    """Test erreur HTTP rapide : latence exclue de la fenêtre du timeout adaptatif"""
+    monkeypatch.setattr(StubRailwayHandler, 'status', 400)
+    monkeypatch.setattr(StubRailwayHandler, 'body', {'error': 'Pas de données fournies'})
+
+    assert dashboard.call_railway_api(client_inputs()) == (None, None)
+    assert not dashboard.predict_latencies()
+    assert dashboard.adaptive_predict_timeout() == dashboard.PREDICT_TIMEOUT
+
+def test_adaptive_timeout_bounds(dashboard):
+    """Test timeout adaptatif : maximum sans mesure, P99 x 3 borné entre minimum et maximum"""
+    latencies = dashboard.predict_latencies()
+    assert dashboard.adaptive_predict_timeout() == dashboard.PREDICT_TIMEOUT
+
+    latencies.extend([0.1] * 5)
+    assert dashboard.adaptive_predict_timeout() == dashboard.MIN_PREDICT_TIMEOUT
+
+    latencies.clear()
+    latencies.extend([5.0] * 5)
+    assert dashboard.adaptive_predict_timeout() == 15.0
+
+    latencies.append(100.0)
+    assert dashboard.adaptive_predict_timeout() == dashboard.PREDICT_TIMEOUT
+
+def test_adaptive_timeout_reset_after_timeout(dashboard, monkeypatch):
+    """Test timeout après appels rapides : retour au timeout maximal pour l'appel suivant"""
+    monkeypatch.setattr(StubRailwayHandler, 'body', {'version': 'RAILWAY_V2', 'threshold': 0.1})
+    for i in range(3):
+        dashboard.call_railway_api(client_inputs(ext_source_2=0.1 * i))
+    assert len(dashboard.predict_latencies()) == 3
+    assert dashboard.adaptive_predict_timeout() == dashboard.MIN_PREDICT_TIMEOUT
+
+    monkeypatch.setattr(dashboard, 'MIN_PREDICT_TIMEOUT', 0.3)
+    monkeypatch.setattr(StubRailwayHandler, 'delay', 1.0)
+    assert dashboard.call_railway_api(client_inputs(ext_source_2=0.9)) == (None, None)
+
+    assert dashboard.adaptive_predict_timeout() == dashboard.PREDICT_TIMEOUT
+
+def test_predict_retried_on_gateway_error(dashboard, monkeypatch):
+    """Test relance de POST /predict sur erreur passerelle (2 relances puis erreur HTTP)"""
+    monkeypatch.setattr(StubRailwayHandler, 'status', 503)
+    monkeypatch.setattr(StubRailwayHandler, 'body', {'error': 'Service indisponible'})
+
+    with pytest.raises(requests.exceptions.HTTPError) as excinfo:
+        dashboard.predict_cached(client_inputs())
+
+    assert StubRailwayHandler.hits == 3
+    assert excinfo.value.response.status_code == 503
+
+def test_cache_hit_not_reported_as_network_call(dashboard, monkeypatch):
+    """Test saisie identique : un seul appel réseau, hit du cache affiché comme tel"""
+    monkeypatch.setattr(StubRailwayHandler, 'body', {
+        'probability': 0.05, 'decision': 'ACCORDE', 'threshold': 0.1,
+        'top_features': [], 'version': 'RAILWAY_V2'
+    })
+
+    result1, api_info1 = dashboard.call_railway_api(client_inputs())
+    result2, api_info2 = dashboard.call_railway_api(client_inputs())
+
+    assert StubRailwayHandler.hits == 1
+    assert result1 == result2
+    assert api_info1.startswith("Railway (") and api_info1.endswith("s)")
+    assert api_info2 == "Railway (résultat en cache)"
+
+def test_read_timeout_not_retried(dashboard, monkeypatch):
+    """Test timeout de lecture : un seul POST, branche Timeout (fenêtre de latences vidée)"""
+    monkeypatch.setattr(StubRailwayHandler, 'delay', 1.0)
+    monkeypatch.setattr(dashboard, 'adaptive_predict_timeout', lambda: 0.3)
+    dashboard.predict_latencies().extend([0.1, 0.1])
+
+    start = time.perf_counter()
+    result, api_info = dashboard.call_railway_api(client_inputs())
+
+    assert time.perf_counter() - start < 1.0
+    assert StubRailwayHandler.hits == 1
+    assert (result, api_info) == (None, None)
+    assert not dashboard.predict_latencies()
+
+def test_body_stall_reported_as_timeout(dashboard, monkeypatch):
+    """Test corps bloqué après les en-têtes : ReadTimeout (et non API indisponible)"""
+    monkeypatch.setattr(StubRailwayHandler, 'body_delay', 1.0)
+
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        dashboard.predict_cached(client_inputs(), _read_timeout=0.3)
+
+    assert StubRailwayHandler.hits == 1
+    assert not dashboard.predict_latencies()
@@ -0,0 +1,29 @@
+"""
+Chargement partagé de la liste des features (Dashboard et tests)
+"""
+
+import json
+from functools import lru_cache
+from pathlib import Path
+
+# Chemin absolu : indépendant du dossier de lancement
+FEATURES_PATH = Path(__file__).resolve().parent.parent / 'data' / 'processed' / 'final_features_list.json'
+
+# Fallback si la liste est absente ou invalide : 234 features génériques
+FALLBACK_FEATURES = tuple(f"feature_{i}" for i in range(234))
+
+def read_feature_names(path):
+    """Lire la liste des features d'un fichier (fallback si absent ou invalide)"""
+    path = Path(path)
+    if path.is_file():
+        try:
+            with open(path, 'r') as f:
+                return tuple(json.load(f)['selected_features'])
+        except (json.JSONDecodeError, KeyError):
+            pass
+    return FALLBACK_FEATURES
+
+@lru_cache(maxsize=1)
+def load_feature_names():
+    """Features du projet (une seule lecture disque par process)"""
+    return read_feature_names(FEATURES_PATH)